@@ -1,7 +1,11 @@
 """
 API routes for movie recommendations.
 """
+import hashlib
+
+import orjson
 from fastapi import APIRouter, HTTPException, Depends
+from fastapi.responses import ORJSONResponse, Response
 from pydantic import BaseModel, Field
 from typing import List, Optional
 
@@ -38,22 +42,22 @@ class RecommendationRequest(BaseModel):
     genres: Optional[List[str]] = Field(
         None,
         description="List of genres (required for Cold Start)",
-        example=["Science Fiction", "Horror"],
+        examples=[["Science Fiction", "Horror"]],
     )
     directors: Optional[List[str]] = Field(
         None,
         description="List of directors (optional for Cold Start)",
-        example=["Some Director"],
+        examples=[["Some Director"]],
     )
     studios: Optional[List[str]] = Field(
         None,
         description="List of studios (optional for Cold Start)",
-        example=["Some Studio"],
+        examples=[["Some Studio"]],
     )
     countries: Optional[List[str]] = Field(
         None,
         description="List of countries (optional for Cold Start)",
-        example=["USA"],
+        examples=[["USA"]],
     )
     year: Optional[int] = Field(
         None,
@@ -64,7 +68,7 @@ class RecommendationRequest(BaseModel):
     keywords: Optional[List[str]] = Field(
         None,
         description="List of keywords (optional for Cold Start)",
-        example=["monster", "future"],
+        examples=[["monster", "future"]],
     )
 
 
@@ -78,16 +82,41 @@ class MovieRecommendation(BaseModel):
     genres_list: List[str] = Field(..., description="List of genres")
 
 
+def _cache_key(request: RecommendationRequest) -> bytes:
+    """
+    Build the exact-match cache key for a recommendation request.
+    
+    The overview is stripped and lowercased (the tokenizer is uncased), and
+    every other field that shapes the response is folded into the digest.
+    """
+    overview = request.overview.strip().lower() if request.overview else None
+    payload = repr((
+        request.tmdb_id,
+        request.top_k,
+        request.title,
+        overview,
+        request.genres,
+        request.directors,
+        request.studios,
+        request.countries,
+        request.year,
+        request.keywords,
+    ))
+    return hashlib.blake2b(payload.encode(), digest_size=16).digest()
+
+
 @router.post(
     "/recommend",
-    response_model=List[MovieRecommendation],
+    response_model=None,
+    response_class=ORJSONResponse,
+    responses={200: {"model": List[MovieRecommendation]}},
     summary="Get movie recommendations (Warm/Cold Start)",
     description="Retrieval engine that returns Top 50 similar movies. Supports Warm Start (tmdb_id only) and Cold Start (full payload for new movies). Returns a list of movies for front-end re-ranking.",
 )
 async def get_recommendations(
     request: RecommendationRequest,
     model_service: ModelService = Depends(get_model_service),
-) -> List[MovieRecommendation]:
+) -> Response:
     """
     Get movie recommendations using Warm Start or Cold Start.
     
@@ -99,7 +128,8 @@ async def get_recommendations(
         model_service: Injected model service dependency
         
     Returns:
-        List of MovieRecommendation objects (Top 50 by default)
+        JSON response with the list of recommendations (Top 50 by default),
+        serialized once with orjson and cached as bytes
         
     Raises:
         HTTPException: If model is not loaded or processing fails
@@ -110,9 +140,16 @@ async def get_recommendations(
             detail="Model service is not loaded. Please try again later.",
         )
     
+    # Serve repeated queries straight from the exact-match cache, which holds
+    # the already-serialized JSON body
+    cache_key = _cache_key(request)
+    cached = model_service.response_cache.get(cache_key)
+    if cached is not None:
+        return Response(content=cached, media_type="application/json")
+    
     try:
         # Get recommendations using Warm/Cold Start logic
-        recommendations = model_service.recommend(
+        recommendations = await model_service.recommend(
             tmdb_id=request.tmdb_id,
             top_k=request.top_k,
             # Cold Start fields
@@ -126,7 +163,9 @@ async def get_recommendations(
             keywords=request.keywords,
         )
         
-        return recommendations
+        body = orjson.dumps(recommendations)
+        model_service.response_cache.put(cache_key, body)
+        return Response(content=body, media_type="application/json")
     
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
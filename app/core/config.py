@@ -5,15 +5,23 @@ import os
 from pathlib import Path
 from typing import List
 
-from pydantic_settings import BaseSettings
+from pydantic import Field, model_validator
+from pydantic_settings import BaseSettings, SettingsConfigDict
+
+CPU_COUNT = os.cpu_count() or 1
 
 
 class Settings(BaseSettings):
     """Application settings."""
     
+    model_config = SettingsConfigDict(env_file=".env", case_sensitive=False)
+    
     # Application
-    DEBUG: bool = os.getenv("DEBUG", "false").lower() == "true"
-    PORT: int = int(os.getenv("PORT", 8000))
+    DEBUG: bool = False
+    PORT: int = 8000
+    LOG_LEVEL: str | None = None  # Defaults to DEBUG when DEBUG=true, WARNING otherwise
+    # Uvicorn worker processes: the uvicorn CLI reads the same variable and also defaults to 1
+    WORKERS: int = Field(default=1, ge=1, validation_alias="WEB_CONCURRENCY")
     
     # Model paths
     MODEL_DIR: Path = Path("models")
@@ -23,21 +31,63 @@ class Settings(BaseSettings):
     
     # Model configuration
     EMBEDDING_SIZE: int = 384  # Based on BERT model hidden_size
-    MAX_SEQUENCE_LENGTH: int = 512
+    MAX_SEQUENCE_LENGTH: int = 128  # Tokens per text (attention cost is O(seq_len²))
     TOP_K: int = 10  # Number of recommendations to return
     
+    # Annoy search: nodes inspected per query. -1 keeps Annoy's default
+    # (n_trees * top_k); raise it for recall, lower it for latency
+    ANNOY_SEARCH_K: int = -1
+    ANNOY_PREFAULT: bool = False  # Page the whole index in at startup (off: lazy, for 512MB instances)
+    
+    # HNSW search (.hnsw index): candidate list size per query (hnswlib uses max(ef, top_k))
+    HNSW_EF: int = 128
+    
+    # Concurrency (default: split the cores evenly across worker processes)
+    THREADPOOL_SIZE: int | None = None  # Worker threads for ONNX/Annoy offloading
+    ONNX_INTRA_OP_THREADS: int | None = None  # Threads per ONNX forward pass (capped at 4 by default)
+    ONNX_ALLOW_SPINNING: bool = False  # Let idle ONNX threads busy-wait for work (burns shared CPU)
+    
+    # Micro-batching (Cold Start embeddings)
+    BATCH_MAX_SIZE: int = 16  # Max texts per ONNX forward pass
+    # Encode the collected soups in one padded forward pass. Only for models whose
+    # outputs don't depend on their batch mates (FP32 or statically quantized):
+    # the shipped dynamic INT8 model computes one activation scale per pass, so a
+    # batched embedding would change with the other texts and their padding.
+    # Off: each soup runs alone, unpadded, and its embedding depends only on it
+    BATCH_ACROSS_REQUESTS: bool = False
+    BATCH_MAX_WAIT_MS: float = 10.0  # Max time to wait for a batch to fill up
+    
+    # Caching
+    # Worst case with these defaults and top_k=100: ~32MB per worker in total
+    RESPONSE_CACHE_SIZE: int = 1024  # Exact-match /recommend JSON bodies (0 disables, ~6KB each at top_k=50)
+    EMBEDDING_CACHE_SIZE: int = 2048  # Cold Start soup embeddings (0 disables, ~1.5KB each)
+    WARM_CACHE_SIZE: int = 4096  # Warm Start neighbor IDs per (movie, top_k) (0 disables, ~0.3KB each)
+    SEMANTIC_CACHE_SIZE: int = 4096  # Cold Start query embeddings + neighbor IDs (0 disables, ~2KB each)
+    SEMANTIC_CACHE_THRESHOLD: float = 0.92  # Min cosine similarity to reuse a query's neighbors
+    
     # CORS
-    ALLOWED_ORIGINS: List[str] = [
-        "http://localhost:3000",
-        "http://localhost:5173",
-        "http://localhost:8080",
-        "https://*.render.com",  # Render deployments
-        "*",  # Allow all origins in production (adjust as needed)
-    ]
-    
-    class Config:
-        env_file = ".env"
-        case_sensitive = False
+    # "*" is matched without scanning the list; to restrict origins set
+    # ALLOWED_ORIGIN_REGEX instead (a single compiled regex match per request), e.g.
+    # r"^(https?://localhost(:\d+)?|https://[^/]+\.render\.com)$"
+    ALLOWED_ORIGINS: List[str] = ["*"]
+    ALLOWED_ORIGIN_REGEX: str | None = None
+    ALLOWED_METHODS: List[str] = ["GET", "POST"]
+    
+    @model_validator(mode="after")
+    def _derive_defaults(self) -> "Settings":
+        """Fill in defaults that depend on other (env-provided) settings."""
+        if self.LOG_LEVEL is None:
+            self.LOG_LEVEL = "DEBUG" if self.DEBUG else "WARNING"
+        self.LOG_LEVEL = self.LOG_LEVEL.upper()  # logging only accepts upper-case names
+        
+        cores_per_worker = max(1, CPU_COUNT // self.WORKERS)
+        if self.THREADPOOL_SIZE is None:
+            self.THREADPOOL_SIZE = cores_per_worker
+        if self.ONNX_INTRA_OP_THREADS is None:
+            # A MiniLM forward pass stops scaling past ~4 threads
+            self.ONNX_INTRA_OP_THREADS = min(4, cores_per_worker)
+        
+        return self
 
 
 settings = Settings()
@@ -1,17 +1,30 @@
 """
 FastAPI application for movie recommendation based on synopsis similarity.
 """
-import os
+import asyncio
+import logging
+import queue
+from concurrent.futures import ThreadPoolExecutor
 from contextlib import asynccontextmanager
-from fastapi import FastAPI, HTTPException
+from logging.handlers import QueueHandler, QueueListener
+from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, ORJSONResponse
 import uvicorn
 
 from app.api.routes import router
 from app.core.config import settings
 from app.services.model_service import ModelService, set_model_service
 
+# Logging: records are pushed onto a queue and written by a background
+# listener thread, so logging never blocks the event loop on stream I/O
+log_queue: queue.Queue = queue.Queue(-1)
+log_listener = QueueListener(log_queue, logging.StreamHandler())
+queue_handler = QueueHandler(log_queue)
+queue_handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s"))
+logging.basicConfig(level=settings.LOG_LEVEL, handlers=[queue_handler])
+logger = logging.getLogger(__name__)
+
 # Global model service instance
 model_service: ModelService | None = None
 
@@ -24,26 +37,50 @@ async def lifespan(app: FastAPI):
     """
     global model_service
     
+    log_listener.start()
+    
     # Startup: Load model
     try:
-        print("Loading model and index...")
+        logger.info("Loading model and index...")
         model_service = ModelService(
             model_path=settings.MODEL_PATH,
             index_path=settings.INDEX_PATH,
             movies_map_path=settings.MOVIES_MAP_PATH,
         )
         model_service.load()
+        
+        # Pay the first-inference cost now instead of on the first request
+        logger.info("Warming up model and index...")
+        model_service.warmup(lengths=[16, 64, settings.MAX_SEQUENCE_LENGTH])
         set_model_service(model_service)
-        print("Model and index loaded successfully!")
-    except Exception as e:
-        print(f"Error loading model: {e}")
+        app.state.model_service = model_service
+        logger.info("Model and index loaded successfully!")
+    except Exception:
+        logger.exception("Error loading model")
+        log_listener.stop()
         raise
     
+    # Bound the threadpool used for ONNX/Annoy offloading so concurrent
+    # requests don't oversubscribe the CPU
+    asyncio.get_running_loop().set_default_executor(
+        ThreadPoolExecutor(max_workers=settings.THREADPOOL_SIZE)
+    )
+    
+    # Start the micro-batcher for Cold Start embeddings
+    batch_task = asyncio.create_task(model_service.batch_loop())
+    
     yield
     
-    # Shutdown: Cleanup (if needed)
+    # Shutdown: Stop the micro-batcher and cleanup
+    batch_task.cancel()
+    try:
+        await batch_task
+    except asyncio.CancelledError:
+        pass
     model_service = None
     set_model_service(None)
+    app.state.model_service = None
+    log_listener.stop()
 
 
 app = FastAPI(
@@ -51,14 +88,18 @@ app = FastAPI(
     description="High-Performance Movie Recommendation API based on Content Similarity using Deep Learning (BERT/ONNX) and Vector Search",
     version="1.0.0",
     lifespan=lifespan,
+    default_response_class=ORJSONResponse,
 )
 
+app.state.model_service = None
+
 # CORS middleware
 app.add_middleware(
     CORSMiddleware,
-    allow_origins=settings.ALLOWED_ORIGINS,
+    allow_origins=[] if settings.ALLOWED_ORIGIN_REGEX else settings.ALLOWED_ORIGINS,
+    allow_origin_regex=settings.ALLOWED_ORIGIN_REGEX,
     allow_credentials=True,
-    allow_methods=["*"],
+    allow_methods=settings.ALLOWED_METHODS,
     allow_headers=["*"],
 )
 
@@ -77,20 +118,17 @@ async def root():
     }
 
 
+# Health checks are the most frequent request: the success body never changes
+HEALTHY_RESPONSE = ORJSONResponse({"status": "healthy", "model_loaded": True})
+
+
 @app.get("/health")
-async def health_check():
+async def health_check(request: Request):
     """Health check endpoint."""
-    from app.services.model_service import get_model_service_instance
-    
-    model_service_instance = get_model_service_instance()
-    
-    if model_service_instance is None or not model_service_instance.is_loaded:
+    service = request.app.state.model_service
+    if service is None or not service.is_loaded:
         raise HTTPException(status_code=503, detail="Model not loaded")
-    
-    return {
-        "status": "healthy",
-        "model_loaded": model_service_instance.is_loaded,
-    }
+    return HEALTHY_RESPONSE
 
 
 @app.exception_handler(Exception)
@@ -100,17 +138,23 @@ async def global_exception_handler(request, exc):
         status_code=500,
         content={
             "error": "Internal server error",
-            "detail": str(exc) if settings.DEBUG else "An error occurred",
+            "detail": repr(exc) if settings.DEBUG else "An error occurred",
         },
     )
 
 
 if __name__ == "__main__":
-    port = int(os.getenv("PORT", 8000))
     uvicorn.run(
         "app.main:app",
         host="0.0.0.0",
-        port=port,
+        port=settings.PORT,
         reload=settings.DEBUG,
+        # Reload mode only supports a single worker
+        workers=1 if settings.DEBUG else settings.WORKERS,
+        # libuv event loop + C HTTP parser (both shipped with uvicorn[standard])
+        loop="uvloop",
+        http="httptools",
+        log_level=settings.LOG_LEVEL.lower(),
+        access_log=settings.DEBUG,  # Skip per-request access-log formatting in production
     )
 
@@ -0,0 +1,149 @@
+"""
+In-process caches used by the model service.
+"""
+import threading
+from collections import OrderedDict
+from typing import Any, Hashable, List, Optional
+
+import numpy as np
+
+
+class LRUCache:
+    """
+    Minimal least-recently-used cache backed by an OrderedDict.
+    
+    The lock only guards the dict operations; values are computed outside
+    it, so concurrent misses on the same key just compute the value twice,
+    which is cheaper than serializing every computation.
+    """
+    
+    def __init__(self, maxsize: int):
+        """
+        Initialize the cache.
+        
+        Args:
+            maxsize: Maximum number of entries kept before evicting the oldest
+        """
+        self.maxsize = maxsize
+        self._data: OrderedDict[Hashable, Any] = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def __len__(self) -> int:
+        return len(self._data)
+    
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Return the cached value for key (marking it as recently used)."""
+        with self._lock:
+            try:
+                self._data.move_to_end(key)
+            except KeyError:
+                return default
+            return self._data[key]
+    
+    def put(self, key: Hashable, value: Any) -> None:
+        """Insert or refresh key, evicting the least recently used entry if full."""
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            if len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+    
+    def clear(self) -> None:
+        """Remove all entries."""
+        with self._lock:
+            self._data.clear()
+
+
+class SemanticCache:
+    """
+    Embedding-level cache for near-duplicate queries.
+    
+    Stores recent L2-normalized query embeddings in a preallocated matrix and
+    finds the closest one with a single matrix-vector product (brute-force
+    inner product, i.e. cosine similarity). A cached result list is reused
+    when the similarity reaches the threshold and it was computed for at least
+    as many results as requested. The least recently used entry is replaced when
+    the cache is full. Guarded by a lock since lookups run in worker threads.
+    """
+    
+    def __init__(self, maxsize: int, dim: int, threshold: float):
+        """
+        Initialize the cache.
+        
+        Args:
+            maxsize: Maximum number of cached embeddings
+            dim: Embedding dimension
+            threshold: Minimum cosine similarity for a hit
+        """
+        self.maxsize = maxsize
+        self.threshold = threshold
+        self._vectors = np.zeros((max(maxsize, 0), dim), dtype=np.float32)
+        self._entries: List[Optional[tuple[int, list]]] = [None] * max(maxsize, 0)
+        self._last_used = np.zeros(max(maxsize, 0), dtype=np.int64)
+        self._size = 0
+        self._clock = 0
+        self._lock = threading.Lock()
+    
+    def __len__(self) -> int:
+        return self._size
+    
+    def get(self, vector: np.ndarray, top_k: int) -> Optional[list]:
+        """
+        Return the results cached for the closest embedding, if close enough.
+        
+        Args:
+            vector: L2-normalized query embedding
+            top_k: Number of results requested
+            
+        Returns:
+            The first top_k cached results, or None on a miss
+        """
+        with self._lock:
+            if self._size == 0:
+                return None
+            
+            scores = self._vectors[:self._size] @ vector
+            best = int(np.argmax(scores))
+            if scores[best] < self.threshold:
+                return None
+            
+            cached_top_k, value = self._entries[best]
+            if cached_top_k < top_k:
+                return None
+            
+            self._clock += 1
+            self._last_used[best] = self._clock
+            return value[:top_k]
+    
+    def put(self, vector: np.ndarray, top_k: int, value: list) -> None:
+        """
+        Cache the results of a query embedding.
+        
+        Args:
+            vector: L2-normalized query embedding
+            top_k: Number of results the value was computed for
+            value: Ranked results to cache (a sliceable sequence)
+        """
+        if self.maxsize <= 0:
+            return
+        
+        with self._lock:
+            if self._size < self.maxsize:
+                slot = self._size
+                self._size += 1
+            else:
+                slot = int(np.argmin(self._last_used))
+            
+            self._clock += 1
+            self._vectors[slot] = vector
+            self._entries[slot] = (top_k, value)
+            self._last_used[slot] = self._clock
+    
+    def clear(self) -> None:
+        """Remove all entries."""
+        with self._lock:
+            self._entries = [None] * max(self.maxsize, 0)
+            self._last_used[:] = 0
+            self._size = 0
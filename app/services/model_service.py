@@ -82,18 +82,104 @@ Model service for loading and using the BERT model and Annoy index.
 
 Stack: ONNX Runtime + Annoy + Sentence-Transformers (all-MiniLM-L6-v2)
 """
+import asyncio
+import hashlib
+import logging
+import math
 import os
 import pickle
+import threading
+from array import array
 from pathlib import Path
-from typing import List, Optional
+from typing import List, Optional, Sequence
 
 import numpy as np
 import onnxruntime as ort
-from annoy import AnnoyIndex
+import orjson
 from tokenizers import Tokenizer
 from fastapi import HTTPException
 
 from app.core.config import settings
+from app.services.cache import LRUCache, SemanticCache
+from app.services.movies_table import MoviesTable
+from app.services.vector_index import AnnoyVectorIndex, FlatVectorIndex, HnswVectorIndex, load_vector_index
+
+logger = logging.getLogger(__name__)
+
+# Long texts are tokenized from their first max_tokens * this characters
+# (English prose averages ~4-5 per WordPiece token). Only a heuristic: long
+# words or runs of whitespace can span more, so _run_model checks the cut
+MAX_CHARS_PER_TOKEN = 8
+
+# CPU flags of the integer dot-product instructions (VPDPBUSD) used by MLAS's
+# INT8 GEMM kernels; without them the u8*s8 path can saturate (VPMADDUBSW)
+VNNI_CPU_FLAGS = ("avx512_vnni", "avx_vnni")
+
+# Batches are padded to their longest text rounded up to this multiple, which
+# keeps the MatMul shapes aligned to MLAS's blocked SIMD kernels
+PAD_TO_MULTIPLE_OF = 8
+
+
+def _soup_fields(label: str, values: Sequence[str | None] | None, limit: int) -> List[str]:
+    """Format the first `limit` non-blank values as "Label: value" soup fields."""
+    if not values:
+        return []
+    return [f"{label}: {value}" for value in (v.strip() for v in values[:limit] if v) if value]
+
+
+def _cpu_has_vnni() -> bool:
+    """Whether the CPU supports VNNI (assumed True when /proc/cpuinfo is unavailable)."""
+    try:
+        flags = Path("/proc/cpuinfo").read_text().split()
+    except OSError:
+        return True
+    return any(flag in flags for flag in VNNI_CPU_FLAGS)
+
+
+def _buffer_view(buffer: np.ndarray, shape: tuple[int, ...], capacity: int) -> tuple[np.ndarray, np.ndarray]:
+    """
+    View the prefix of a flat, reusable buffer with the given shape.
+    
+    The buffer is only replaced (zero-filled, at least `capacity` elements) when
+    it is too small, so steady-state batches never allocate.
+    
+    Args:
+        buffer: Flat buffer to reuse
+        shape: Shape of the requested view
+        capacity: Minimum size of a replacement buffer
+        
+    Returns:
+        (buffer, view): the buffer to keep and a contiguous view of its prefix
+    """
+    size = math.prod(shape)
+    if buffer.size < size:
+        buffer = np.zeros(max(size, capacity), dtype=buffer.dtype)
+    return buffer, buffer[:size].reshape(shape)
+
+
+def _mean_pool_normalize(last_hidden_state: np.ndarray, attention_mask: np.ndarray) -> np.ndarray:
+    """
+    Masked mean pooling followed by L2 normalization.
+    
+    The masked sum is a single einsum contraction (no [B, T, H] masked copy
+    of the hidden states), and both divisions happen in place on the [B, H]
+    output.
+    
+    Args:
+        last_hidden_state: Hidden states with shape [batch_size, seq_len, hidden_size]
+        attention_mask: Attention mask with shape [batch_size, seq_len]
+        
+    Returns:
+        Normalized embeddings with shape [batch_size, hidden_size]
+    """
+    mask = attention_mask.astype(last_hidden_state.dtype)
+    embeddings = np.einsum("bth,bt->bh", last_hidden_state, mask)
+    counts = mask.sum(axis=1, keepdims=True)
+    embeddings /= np.maximum(counts, 1e-9, out=counts)
+    # Row norms via einsum: skips linalg.norm's generic axis/keepdims dispatch
+    norms = np.sqrt(np.einsum("bh,bh->b", embeddings, embeddings))[:, np.newaxis]
+    embeddings /= np.maximum(norms, 1e-12, out=norms)  # Avoid division by zero
+    return embeddings
 
 
 class ModelService:
@@ -112,8 +198,8 @@ class ModelService:
         
         Args:
             model_path: Path to the ONNX model file
-            index_path: Path to the Annoy index file
-            movies_map_path: Path to the movies mapping pickle file
+            index_path: Path to the Annoy index (.ann), HNSW index (.hnsw) or normalized embeddings (.npy)
+            movies_map_path: Path to the movies mapping (pickle, or columnar .json)
         """
         self.model_path = model_path
         self.index_path = index_path
@@ -121,9 +207,32 @@ class ModelService:
         
         self.session: ort.InferenceSession | None = None
         self.tokenizer: Tokenizer | None = None
-        self.index: AnnoyIndex | None = None
-        self.movies_map: dict | None = None
+        self._input_ids_name: str | None = None  # ONNX input names, resolved once in load()
+        self._mask_name: str | None = None
+        self._token_type_name: str | None = None  # None if the model takes no token_type_ids
+        self._output_name: str | None = None
+        self._pooled_output = False  # Model already returns normalized [B, H] embeddings
+        self._io_binding: ort.IOBinding | None = None  # Created once, rebound per batch
+        # Flat buffers reused by every batch (see _buffer_view), guarded by _buffers_lock
+        self._input_ids = np.zeros(0, dtype=np.int64)
+        self._attention_mask = np.zeros(0, dtype=np.int64)
+        self._token_type_ids = np.zeros(0, dtype=np.int64)  # Never written: stays all zeros
+        self._hidden_state = np.zeros(0, dtype=np.float32)
+        self._buffers_lock = threading.Lock()
+        self.index: AnnoyVectorIndex | FlatVectorIndex | HnswVectorIndex | None = None
+        self.movies: MoviesTable | None = None  # Columnar movies map, indexed by annoy_id
         self.tmdb_to_annoy: dict[int, int] | None = None  # Reverse index: tmdb_id -> annoy_id
+        self._max_text_chars: int | None = None  # Texts are cut here before tokenizing
+        self._pad_id = 0
+        self._queue: asyncio.Queue[tuple[str, int, asyncio.Future]] | None = None  # Micro-batching queue
+        self.response_cache = LRUCache(settings.RESPONSE_CACHE_SIZE)  # Exact-match /recommend JSON bodies
+        self.embedding_cache = LRUCache(settings.EMBEDDING_CACHE_SIZE)  # Soup hash -> normalized embedding
+        self.warm_cache = LRUCache(settings.WARM_CACHE_SIZE)  # (annoy_id, top_k) -> Warm Start neighbor IDs
+        self.semantic_cache = SemanticCache(  # Near-duplicate Cold Start queries
+            settings.SEMANTIC_CACHE_SIZE,
+            settings.EMBEDDING_SIZE,
+            settings.SEMANTIC_CACHE_THRESHOLD,
+        )
         self._is_loaded = False
     
     @property
@@ -134,28 +243,35 @@ class ModelService:
     def load(self) -> None:
         """Load the model, tokenizer, index, and movies map."""
         try:
-            # Debug: Print current working directory and paths
-            import os
-            print(f"Current working directory: {os.getcwd()}")
-            print(f"Model path: {self.model_path} (exists: {self.model_path.exists()})")
-            print(f"Index path: {self.index_path} (exists: {self.index_path.exists()})")
-            print(f"Movies map path: {self.movies_map_path} (exists: {self.movies_map_path.exists()})")
-            
-            # List models directory if it exists
-            models_dir = self.model_path.parent.parent
-            if models_dir.exists():
-                print(f"Contents of {models_dir}:")
-                for item in models_dir.iterdir():
-                    if item.is_file():
-                        print(f"  📄 {item.name} ({item.stat().st_size / 1024 / 1024:.2f} MB)")
-                    elif item.is_dir():
-                        print(f"  📁 {item.name}/")
+            # Debug: Log current working directory, paths and models directory
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("Current working directory: %s", os.getcwd())
+                logger.debug("Model path: %s (exists: %s)", self.model_path, self.model_path.exists())
+                logger.debug("Index path: %s (exists: %s)", self.index_path, self.index_path.exists())
+                logger.debug("Movies map path: %s (exists: %s)", self.movies_map_path, self.movies_map_path.exists())
+                
+                models_dir = self.model_path.parent.parent
+                if models_dir.exists():
+                    logger.debug("Contents of %s:", models_dir)
+                    for item in models_dir.iterdir():
+                        if item.is_file():
+                            logger.debug("  📄 %s (%.2f MB)", item.name, item.stat().st_size / 1024 / 1024)
+                        elif item.is_dir():
+                            logger.debug("  📁 %s/", item.name)
+            
+            # On CPUs without VNNI prefer the reduce_range build of the INT8
+            # model when it is shipped next to the default one
+            model_path = self.model_path
+            reduce_range_path = model_path.with_name(f"{model_path.stem}_reduce_range{model_path.suffix}")
+            if reduce_range_path.exists() and not _cpu_has_vnni():
+                logger.info("CPU without VNNI: using %s", reduce_range_path.name)
+                model_path = reduce_range_path
             
             # Load ONNX model with memory optimizations for Render (512MB limit)
-            print(f"Loading ONNX model from {self.model_path}")
+            logger.info("Loading ONNX model from %s", model_path)
             
-            if not self.model_path.exists():
-                raise FileNotFoundError(f"Model file not found at {self.model_path.absolute()}")
+            if not model_path.exists():
+                raise FileNotFoundError(f"Model file not found at {model_path.absolute()}")
             
             # Configure session options to minimize memory usage for Render's 512MB limit
             session_options = ort.SessionOptions()
@@ -171,68 +287,299 @@ class ModelService:
                 # ExecutionMode not available in this version, skip
                 pass
             
-            # Use basic graph optimization (vs full optimization which uses more memory)
+            # Use full graph optimization: the model is quantized to INT8
+            # (QOperator, see scripts/quantize_model.py) and the extended
+            # fusions let the integer MatMul/Attention kernels run fused
             try:
-                # Try to set basic optimization level (reduces memory overhead)
-                session_options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_BASIC
+                session_options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
             except (AttributeError, TypeError):
                 # GraphOptimizationLevel not available in this version, use default
                 pass
             
+            # Share the cores with the other uvicorn workers instead of each
+            # worker spinning up one ONNX thread per core
+            session_options.intra_op_num_threads = settings.ONNX_INTRA_OP_THREADS
+            session_options.inter_op_num_threads = 1  # Sequential execution: no inter-op parallelism
+            
+            # Don't let idle pool threads spin between requests on a shared instance
+            # (ORT's equivalent of OMP_WAIT_POLICY=PASSIVE)
+            allow_spinning = "1" if settings.ONNX_ALLOW_SPINNING else "0"
+            session_options.add_session_config_entry("session.intra_op.allow_spinning", allow_spinning)
+            session_options.add_session_config_entry("session.inter_op.allow_spinning", allow_spinning)
+            
             self.session = ort.InferenceSession(
-                str(self.model_path),
+                str(model_path),
                 sess_options=session_options,
                 providers=["CPUExecutionProvider"],
             )
+            logger.info("ONNX Runtime providers: %s", self.session.get_providers())
+            
+            # Resolve the model's input names once instead of on every inference
+            for model_input in self.session.get_inputs():
+                name_lower = model_input.name.lower()
+                if "input_ids" in name_lower:
+                    self._input_ids_name = model_input.name
+                elif "attention" in name_lower or "mask" in name_lower:
+                    self._mask_name = model_input.name
+                elif "token_type_ids" in name_lower or "segment" in name_lower:
+                    # BERT requires token_type_ids for some models
+                    self._token_type_name = model_input.name
+            self._output_name = self.session.get_outputs()[0].name
+            # Models built with scripts/add_pooling.py pool and normalize in-graph
+            self._pooled_output = len(self.session.get_outputs()[0].shape) == 2
+            self._io_binding = self.session.io_binding()
             
             # Load tokenizer
             tokenizer_path = self.model_path.parent / "tokenizer.json"
             if not tokenizer_path.exists():
                 raise FileNotFoundError(f"Tokenizer not found at {tokenizer_path}")
             
-            print(f"Loading tokenizer from {tokenizer_path}")
+            logger.info("Loading tokenizer from %s", tokenizer_path)
             self.tokenizer = Tokenizer.from_file(str(tokenizer_path))
             
+            # Attention cost grows with seq_len², so truncate at MAX_SEQUENCE_LENGTH
+            # and pad each batch only to its longest text (see _pack_batch)
+            # instead of the fixed 128 tokens configured in tokenizer.json.
+            self.tokenizer.enable_truncation(max_length=settings.MAX_SEQUENCE_LENGTH)
+            padding = self.tokenizer.padding
+            self._pad_id = padding["pad_id"] if padding else 0
+            self.tokenizer.no_padding()
+            
+            # Cap raw text length so the tokenizer never scans characters that
+            # truncation would throw away anyway (overview allows 5000 chars)
+            self._max_text_chars = settings.MAX_SEQUENCE_LENGTH * MAX_CHARS_PER_TOKEN
+            
             # Load Annoy index
-            print(f"Loading Annoy index from {self.index_path}")
+            logger.info("Loading vector index from %s", self.index_path)
             if not self.index_path.exists():
                 # Additional debugging
-                print(f"Index path absolute: {self.index_path.absolute()}")
-                print(f"Index path parent exists: {self.index_path.parent.exists()}")
+                logger.error("Index path absolute: %s", self.index_path.absolute())
+                logger.error("Index path parent exists: %s", self.index_path.parent.exists())
                 if self.index_path.parent.exists():
-                    print(f"Files in {self.index_path.parent}:")
+                    logger.error("Files in %s:", self.index_path.parent)
                     for item in self.index_path.parent.iterdir():
-                        print(f"  - {item.name} ({'file' if item.is_file() else 'dir'})")
+                        logger.error("  - %s (%s)", item.name, "file" if item.is_file() else "dir")
                 raise FileNotFoundError(f"Index not found at {self.index_path.absolute()}")
             
-            self.index = AnnoyIndex(settings.EMBEDDING_SIZE, "angular")
-            self.index.load(str(self.index_path))
+            # Annoy (.ann), HNSW (.hnsw) or exact flat search over normalized embeddings (.npy)
+            self.index = load_vector_index(
+                self.index_path,
+                settings.EMBEDDING_SIZE,
+                settings.THREADPOOL_SIZE,
+                settings.ANNOY_SEARCH_K,
+                settings.ANNOY_PREFAULT,
+                settings.HNSW_EF,
+            )
             
             # Load movies map
-            print(f"Loading movies map from {self.movies_map_path}")
+            logger.info("Loading movies map from %s", self.movies_map_path)
             if not self.movies_map_path.exists():
                 raise FileNotFoundError(f"Movies map not found at {self.movies_map_path}")
             
-            with open(self.movies_map_path, "rb") as f:
-                self.movies_map = pickle.load(f)
+            if self.movies_map_path.suffix == ".json":
+                # Columnar JSON (scripts/export_movies_table.py): one orjson parse
+                with open(self.movies_map_path, "rb") as f:
+                    self.movies = MoviesTable.from_columns(orjson.loads(f.read()))
+            else:
+                with open(self.movies_map_path, "rb") as f:
+                    movies_map = pickle.load(f)
+                
+                # Convert the dict-of-dicts into contiguous per-field columns and
+                # drop it: ~17k small dicts scattered across the heap
+                self.movies = MoviesTable.from_map(movies_map)
+                del movies_map
             
             # Build reverse index: tmdb_id -> annoy_id
-            print("Building reverse index (tmdb_id -> annoy_id)...")
-            self.tmdb_to_annoy = {}
-            for annoy_id, movie_data in self.movies_map.items():
-                if isinstance(movie_data, dict):
-                    tmdb_id = movie_data.get("tmdb_id")
-                    if tmdb_id is not None:
-                        self.tmdb_to_annoy[tmdb_id] = annoy_id
-            print(f"Reverse index built: {len(self.tmdb_to_annoy)} movies indexed")
+            logger.info("Building reverse index (tmdb_id -> annoy_id)...")
+            self.tmdb_to_annoy = self.movies.tmdb_index()
+            logger.info("Reverse index built: %d movies indexed", len(self.tmdb_to_annoy))
+            
+            # Responses, embeddings and neighbors cached from a previous model/index are stale
+            self.response_cache.clear()
+            self.embedding_cache.clear()
+            self.warm_cache.clear()
+            self.semantic_cache.clear()
             
             self._is_loaded = True
-            print("All components loaded successfully!")
+            logger.info("All components loaded successfully!")
         
-        except Exception as e:
-            print(f"Error loading components: {e}")
+        except Exception:
+            logger.exception("Error loading components")
             raise
     
+    def _build_inputs(self, input_ids: np.ndarray, attention_mask: np.ndarray) -> dict:
+        """
+        Map tokenized arrays to the ONNX model's input names.
+        
+        Args:
+            input_ids: Token IDs with shape [batch_size, seq_len]
+            attention_mask: Attention mask with shape [batch_size, seq_len]
+            
+        Returns:
+            Feed dict for session.run
+        """
+        inputs = {self._input_ids_name: input_ids, self._mask_name: attention_mask}
+        if self._token_type_name is not None:
+            # For single sentence tasks token_type_ids are all zeros
+            capacity = settings.BATCH_MAX_SIZE * settings.MAX_SEQUENCE_LENGTH
+            self._token_type_ids, token_type_ids = _buffer_view(self._token_type_ids, input_ids.shape, capacity)
+            inputs[self._token_type_name] = token_type_ids
+        
+        return inputs
+    
+    def warmup(self, lengths: List[int]) -> None:
+        """
+        Run dummy inferences so the first real request doesn't pay for
+        ONNX Runtime's lazy kernel setup or Annoy's first page faults.
+        
+        Args:
+            lengths: Sequence lengths to prime (one forward pass per shape)
+        """
+        if self.session is None or self.index is None:
+            raise ValueError("Model or index not loaded")
+        
+        for length in lengths:
+            input_ids = np.zeros((1, length), dtype=np.int64)
+            attention_mask = np.ones((1, length), dtype=np.int64)
+            self.session.run([self._output_name], self._build_inputs(input_ids, attention_mask))
+        
+        self.index.search(np.zeros(settings.EMBEDDING_SIZE, dtype=np.float32), 10)
+    
+    def _pack_batch(self, encodings: list, pad_to_multiple_of: int) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Pad tokenized texts into the reusable input buffers.
+        
+        The returned arrays are views into buffers shared by every batch:
+        the caller must hold _buffers_lock until it is done with them.
+        
+        Args:
+            encodings: Tokenizer encodings (unpadded)
+            pad_to_multiple_of: Round the padded length up to this multiple
+            
+        Returns:
+            (input_ids, attention_mask), both int64 with shape [len(encodings), seq_len]
+        """
+        # Every .ids access builds a new list: materialize each one once
+        token_ids = [encoding.ids for encoding in encodings]
+        
+        # Pad to the longest text in the batch, rounded up to pad_to_multiple_of
+        seq_len = max(map(len, token_ids))
+        seq_len = -(-seq_len // pad_to_multiple_of) * pad_to_multiple_of
+        shape = (len(encodings), seq_len)
+        capacity = settings.BATCH_MAX_SIZE * settings.MAX_SEQUENCE_LENGTH
+        self._input_ids, input_ids = _buffer_view(self._input_ids, shape, capacity)
+        self._attention_mask, attention_mask = _buffer_view(self._attention_mask, shape, capacity)
+        input_ids.fill(self._pad_id)
+        attention_mask.fill(0)
+        for i, ids in enumerate(token_ids):
+            input_ids[i, :len(ids)] = ids
+            attention_mask[i, :len(ids)] = 1  # Unpadded encodings: every token is real
+        return input_ids, attention_mask
+    
+    def _encode_batch(self, texts: List[str]) -> np.ndarray:
+        """
+        Encode a batch of texts, skipping the model for texts seen recently.
+        
+        Texts missing from the embedding cache are sent to _run_model.
+        
+        Args:
+            texts: Input texts to encode
+            
+        Returns:
+            Normalized embedding matrix with shape [len(texts), hidden_size]
+        """
+        if self.session is None or self.tokenizer is None:
+            raise ValueError("Model or tokenizer not loaded")
+        
+        keys = [hashlib.blake2b(text.encode(), digest_size=8).digest() for text in texts]
+        embeddings = np.empty((len(texts), settings.EMBEDDING_SIZE), dtype=np.float32)
+        misses = []
+        cache_get = self.embedding_cache.get
+        for i, key in enumerate(keys):
+            cached = cache_get(key)
+            if cached is None:
+                misses.append(i)
+            else:
+                embeddings[i] = cached
+        
+        if misses:
+            embeddings[misses] = self._run_model([texts[i] for i in misses])
+            for i in misses:
+                self.embedding_cache.put(keys[i], embeddings[i].copy())
+        
+        return embeddings
+    
+    def _run_model(self, texts: List[str]) -> np.ndarray:
+        """
+        Encode texts with BERT, truncated to MAX_SEQUENCE_LENGTH tokens.
+        
+        With BATCH_ACROSS_REQUESTS the texts share one forward pass, padded
+        only to the longest one. Otherwise each text runs alone and unpadded,
+        so its embedding never depends on the texts it was queued with.
+        
+        Args:
+            texts: Input texts to encode
+            
+        Returns:
+            Normalized embedding matrix with shape [len(texts), hidden_size]
+        """
+        # A long text is tokenized from a prefix cut at a space: words stay whole,
+        # so the prefix's tokens are a prefix of the full text's. They match after
+        # truncation only if the prefix still overflows MAX_SEQUENCE_LENGTH;
+        # otherwise the whole text is tokenized
+        max_chars = self._max_text_chars
+        heads = [text if len(text) <= max_chars else text[:max_chars].rpartition(" ")[0] for text in texts]
+        encodings = self.tokenizer.encode_batch(heads)
+        for i, (text, encoding) in enumerate(zip(texts, encodings)):
+            if len(text) > max_chars and not encoding.overflowing:
+                encodings[i] = self.tokenizer.encode(text)
+        
+        if settings.BATCH_ACROSS_REQUESTS:
+            return self._forward(encodings, PAD_TO_MULTIPLE_OF)
+        return np.concatenate([self._forward([encoding], 1) for encoding in encodings])
+    
+    def _forward(self, encodings: list, pad_to_multiple_of: int) -> np.ndarray:
+        """
+        Run one BERT forward pass over tokenized texts and pool the output.
+        
+        Args:
+            encodings: Tokenizer encodings (unpadded)
+            pad_to_multiple_of: Round the padded length up to this multiple
+            
+        Returns:
+            Normalized embedding matrix with shape [len(encodings), hidden_size]
+        """
+        hidden_size = settings.EMBEDDING_SIZE
+        
+        # Run inference with IOBinding: every input and the output live in
+        # reusable buffers bound by pointer, so a batch allocates nothing
+        with self._buffers_lock:
+            input_ids, attention_mask = self._pack_batch(encodings, pad_to_multiple_of)
+            batch_size, seq_len = input_ids.shape
+            binding = self._io_binding
+            for name, array in self._build_inputs(input_ids, attention_mask).items():
+                binding.bind_input(name, "cpu", 0, np.int64, array.shape, array.ctypes.data)
+            
+            # Output: [batch_size, seq_len, hidden_size], or [batch_size, hidden_size] if pooled in-graph
+            shape = (batch_size, hidden_size) if self._pooled_output else (batch_size, seq_len, hidden_size)
+            capacity = settings.BATCH_MAX_SIZE * settings.MAX_SEQUENCE_LENGTH * hidden_size
+            self._hidden_state, output = _buffer_view(self._hidden_state, shape, capacity)
+            binding.bind_output(
+                self._output_name,
+                "cpu",
+                0,
+                np.float32,
+                output.shape,
+                output.ctypes.data,
+            )
+            self.session.run_with_iobinding(binding)
+            
+            if self._pooled_output:
+                return output.copy()  # The buffer is reused by the next batch
+            
+            # Extract embedding (mean pooling of last hidden state + L2 normalize)
+            return _mean_pool_normalize(output, attention_mask)
+    
     def _encode_text(self, text: str) -> np.ndarray:
         """
         Encode text using the BERT model.
@@ -243,49 +590,112 @@ class ModelService:
         Returns:
             Embedding vector
         """
-        if self.session is None or self.tokenizer is None:
-            raise ValueError("Model or tokenizer not loaded")
+        return self._encode_batch([text])[0]  # Return first (and only) embedding
+    
+    def _recommend_batch(self, texts: List[str], top_ks: List[int]) -> List[List[dict]]:
+        """
+        Cold Start pipeline for a batch of metadata soups.
+        
+        Encodes the texts (see _run_model), serves near-duplicates from the
+        semantic cache and searches the rest as one batch (a single matmul on
+        the flat index, concurrent searches on Annoy, which releases the GIL).
+        Blocking; called from a worker thread.
         
-        # Tokenize text
-        encoding = self.tokenizer.encode(text)
-        input_ids = np.array([encoding.ids], dtype=np.int64)
-        attention_mask = np.array([encoding.attention_mask], dtype=np.int64)
-        
-        # Get input names from the model to see what inputs are required
-        input_names = [input.name for input in self.session.get_inputs()]
-        
-        # Prepare inputs in the correct order
-        inputs = {}
-        for name in input_names:
-            name_lower = name.lower()
-            if "input_ids" in name_lower:
-                inputs[name] = input_ids
-            elif "attention" in name_lower or "mask" in name_lower:
-                inputs[name] = attention_mask
-            elif "token_type_ids" in name_lower or "segment" in name_lower:
-                # BERT requires token_type_ids for some models
-                # For single sentence tasks, use all zeros
-                token_type_ids = np.zeros_like(input_ids, dtype=np.int64)
-                inputs[name] = token_type_ids
-        
-        # Run inference
-        outputs = self.session.run(None, inputs)
-        
-        # Extract embedding (mean pooling of last hidden state)
-        last_hidden_state = outputs[0]  # Shape: [batch_size, seq_len, hidden_size]
-        attention_mask_expanded = np.expand_dims(attention_mask, axis=-1)
-        
-        # Mean pooling with attention mask
-        sum_embeddings = np.sum(last_hidden_state * attention_mask_expanded, axis=1)
-        sum_mask = np.sum(attention_mask_expanded, axis=1)
-        embedding = sum_embeddings / sum_mask
-        
-        # Normalize
-        norm = np.linalg.norm(embedding, axis=1, keepdims=True)
-        norm = np.where(norm == 0, 1, norm)  # Avoid division by zero
-        embedding = embedding / norm
-        
-        return embedding[0]  # Return first (and only) embedding
+        Args:
+            texts: Metadata soups to encode
+            top_ks: Number of recommendations requested for each text
+            
+        Returns:
+            Recommendations for each text, in input order
+        """
+        embeddings = self._encode_batch(texts)
+        
+        # Paraphrased synopses land next to a previous query: reuse its neighbors.
+        # Only the IDs are cached (packed as int32); enriching them is cheap
+        neighbors = [self.semantic_cache.get(embedding, top_k) for embedding, top_k in zip(embeddings, top_ks)]
+        misses = [i for i, ids in enumerate(neighbors) if ids is None]
+        
+        if misses:
+            searched = self.index.search_batch(embeddings[misses], [top_ks[i] for i in misses])
+            for i, ids in zip(misses, searched):
+                neighbors[i] = array("i", ids)
+                self.semantic_cache.put(embeddings[i], top_ks[i], neighbors[i])
+        
+        return [self.movies.rows(ids) for ids in neighbors]
+    
+    async def _recommend_cold_start(self, soup: str, top_k: int) -> List[dict]:
+        """
+        Submit a Cold Start query to the micro-batching queue.
+        
+        Falls back to running the pipeline directly when the batch loop is not running.
+        
+        Args:
+            soup: Metadata soup to encode
+            top_k: Number of recommendations to return
+            
+        Returns:
+            List of recommendation dictionaries
+        """
+        if self._queue is None:
+            results = await asyncio.to_thread(self._recommend_batch, [soup], [top_k])
+            return results[0]
+        
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((soup, top_k, future))
+        return await future
+    
+    async def batch_loop(self) -> None:
+        """
+        Background micro-batcher for Cold Start requests.
+        
+        Waits for the first queued soup, takes every soup already queued behind
+        it (up to BATCH_MAX_SIZE) and runs the batch through _recommend_batch
+        in a worker thread: one thread hop, cache lookups and parallel Annoy
+        searches for all texts. Only with BATCH_ACROSS_REQUESTS, where the
+        texts also share one BERT forward pass, does it wait up to
+        BATCH_MAX_WAIT_MS for the batch to fill up.
+        """
+        loop = asyncio.get_running_loop()
+        # Waiting only pays off when the batch shares a forward pass
+        max_wait = settings.BATCH_MAX_WAIT_MS / 1000 if settings.BATCH_ACROSS_REQUESTS else 0
+        self._queue = asyncio.Queue()
+        batch: List[tuple[str, int, asyncio.Future]] = []
+        
+        try:
+            while True:
+                batch = [await self._queue.get()]
+                while len(batch) < settings.BATCH_MAX_SIZE and not self._queue.empty():
+                    batch.append(self._queue.get_nowait())
+                deadline = loop.time() + max_wait
+                while len(batch) < settings.BATCH_MAX_SIZE:
+                    timeout = deadline - loop.time()
+                    if timeout <= 0:
+                        break
+                    try:
+                        batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                    except asyncio.TimeoutError:
+                        break
+                
+                texts = [text for text, _, _ in batch]
+                top_ks = [top_k for _, top_k, _ in batch]
+                try:
+                    results = await loop.run_in_executor(None, self._recommend_batch, texts, top_ks)
+                except Exception as e:
+                    for _, _, future in batch:
+                        if not future.done():
+                            future.set_exception(e)
+                else:
+                    for (_, _, future), recommendations in zip(batch, results):
+                        if not future.done():
+                            future.set_result(recommendations)
+                batch = []
+        finally:
+            # Shutdown: Fail any request still waiting on a result
+            queue, self._queue = self._queue, None
+            while not queue.empty():
+                batch.append(queue.get_nowait())
+            for _, _, future in batch:
+                future.cancel()
     
     def build_soup_from_payload(
         self,
@@ -322,51 +732,20 @@ class ModelService:
         Returns:
             Metadata soup string in training format
         """
-        soup_parts = []
-        
-        # 1. Keywords (Top 5)
-        if keywords:
-            for keyword in keywords[:5]:
-                if keyword and keyword.strip():
-                    soup_parts.append(f"Keyword: {keyword.strip()}")
-        
-        # 2. Genres (Top 3)
-        if genres:
-            for genre in genres[:3]:
-                if genre and genre.strip():
-                    soup_parts.append(f"Genre: {genre.strip()}")
-        
-        # 3. Directors (Top 2)
-        if directors:
-            for director in directors[:2]:
-                if director and director.strip():
-                    soup_parts.append(f"Director: {director.strip()}")
-        
-        # 4. Studios (Top 2)
-        if studios:
-            for studio in studios[:2]:
-                if studio and studio.strip():
-                    soup_parts.append(f"Studio: {studio.strip()}")
-        
-        # 5. Countries (Top 1)
-        if countries:
-            country = countries[0]
-            if country and country.strip():
-                soup_parts.append(f"Country: {country.strip()}")
-        
-        # 6. Year, Title, Overview
-        if year:
-            soup_parts.append(f"Year: {year}")
-        
-        if title and title.strip():
-            soup_parts.append(f"Title: {title.strip()}")
-        
-        if overview and overview.strip():
-            soup_parts.append(f"Overview: {overview.strip()}")
-        
-        return ". ".join(soup_parts)
+        return ". ".join((
+            # 1-5. Keywords, Genres, Directors, Studios, Countries (Top N of each)
+            *_soup_fields("Keyword", keywords, 5),
+            *_soup_fields("Genre", genres, 3),
+            *_soup_fields("Director", directors, 2),
+            *_soup_fields("Studio", studios, 2),
+            *_soup_fields("Country", countries, 1),
+            # 6. Year, Title, Overview
+            *((f"Year: {year}",) if year else ()),
+            *_soup_fields("Title", (title,), 1),
+            *_soup_fields("Overview", (overview,), 1),
+        ))
     
-    def recommend(
+    async def recommend(
         self,
         tmdb_id: int,
         top_k: int = 50,
@@ -407,19 +786,18 @@ class ModelService:
         if self.index is None:
             raise ValueError("Index not loaded")
         
-        if self.movies_map is None:
+        if self.movies is None:
             raise ValueError("Movies map not loaded")
         
         # ============================================================
         # WARM START vs COLD START
         # ============================================================
-        query_embedding: np.ndarray | None = None
-        
         # Check if tmdb_id exists in movies_map (Warm Start)
         if self.tmdb_to_annoy and tmdb_id in self.tmdb_to_annoy:
-            # WARM START: Use pre-computed embedding from Annoy
+            # WARM START: Search from the movie's pre-computed embedding in the index.
+            # Retrieval + enrichment are CPU-bound: keep them off the event loop
             annoy_id = self.tmdb_to_annoy[tmdb_id]
-            query_embedding = np.array(self.index.get_item_vector(annoy_id))
+            return await asyncio.to_thread(self._search, annoy_id, top_k)
         else:
             # COLD START: Build metadata soup and generate embedding
             if not overview or not overview.strip():
@@ -440,42 +818,40 @@ class ModelService:
             if not soup or len(soup.strip()) < 10:
                 raise ValueError("Metadata soup is too short. Provide at least overview.")
             
-            # Generate embedding from soup
-            query_embedding = self._encode_text(soup)
+            # Encode + search, micro-batched with concurrent Cold Start requests
+            return await self._recommend_cold_start(soup, top_k)
+    
+    def _search(self, annoy_id: int, top_k: int) -> List[dict]:
+        """
+        Run the Warm Start vector search and translate the neighbors into response dicts.
+        
+        Blocking; called from a worker thread by recommend().
         
+        Args:
+            annoy_id: Index item whose stored embedding is the query
+            top_k: Number of recommendations to return
+            
+        Returns:
+            List of recommendation dictionaries
+        """
         # ============================================================
         # BUSCA VETORIAL (RETRIEVAL)
         # ============================================================
-        neighbors, distances = self.index.get_nns_by_vector(
-            query_embedding.tolist(),
-            n=top_k,
-            include_distances=True,
-        )
+        # Popular movies are asked for over and over: the neighbors only depend
+        # on (annoy_id, top_k). Only the IDs are kept, packed as int32 (~0.3KB
+        # at top_k=50, a tuple of ints is ~2KB): enriching them again is cheap
+        # and the response cache already holds the rendered bodies
+        cache_key = (annoy_id, top_k)
+        neighbors = self.warm_cache.get(cache_key)
+        if neighbors is None:
+            neighbors = array("i", self.index.search_item(annoy_id, top_k))
+            self.warm_cache.put(cache_key, neighbors)
         
         # ============================================================
         # ENRIQUECIMENTO DOS RESULTADOS
         # ============================================================
-        recommendations = []
-        for annoy_id in neighbors:
-            if annoy_id not in self.movies_map:
-                continue
-            
-            movie_info = self.movies_map[annoy_id]
-            if not isinstance(movie_info, dict):
-                continue
-            
-            # Build response in required format
-            recommendation = {
-                "tmdb_id": int(movie_info.get("tmdb_id", 0)),
-                "title": str(movie_info.get("title", "")),
-                "year": str(movie_info.get("year", "")),
-                "poster_path": movie_info.get("poster_path"),
-                "genres_list": movie_info.get("genres_list", []),
-            }
-            
-            recommendations.append(recommendation)
-        
-        return recommendations
+        # Direct lookups in the movie columns, in ranking order
+        return self.movies.rows(neighbors)
 
 
 # Global model service instance (will be set on startup)
@@ -0,0 +1,179 @@
+"""
+Columnar (Struct-of-Arrays) view of the movies map.
+
+The pickled movies map is a dict of dicts keyed by Annoy ID. Walking it for
+every recommendation means one dict lookup, one isinstance check and four
+.get() calls per neighbor. Here each field is stored as its own contiguous
+NumPy column indexed directly by Annoy ID, so enriching a neighbor list is a
+plain positional lookup per field.
+
+The table can also be persisted in a columnar JSON layout (see to_columns),
+which loads with one orjson.loads instead of unpickling ~17k small dicts.
+"""
+from typing import Iterable, List
+
+import numpy as np
+
+
+class MoviesTable:
+    """
+    Movie metadata stored as one NumPy column per field, indexed by Annoy ID.
+    """
+    
+    def __init__(
+        self,
+        tmdb_ids: np.ndarray,
+        titles: np.ndarray,
+        years: np.ndarray,
+        poster_paths: np.ndarray,
+        genres_lists: np.ndarray,
+        present: np.ndarray,
+    ):
+        """
+        Initialize the table from prebuilt columns.
+        
+        Args:
+            tmdb_ids: TMDB IDs (int32)
+            titles: Titles (object, str)
+            years: Release years (object, str)
+            poster_paths: Poster paths (object, str or None)
+            genres_lists: Genre lists (object, list of str)
+            present: Whether each Annoy ID has movie data (bool)
+        """
+        self.tmdb_ids = tmdb_ids
+        self.titles = titles
+        self.years = years
+        self.poster_paths = poster_paths
+        self.genres_lists = genres_lists
+        self.present = present
+        # Python-list copies of the columns: indexing a list with an int from the
+        # vector index is cheaper than a NumPy gather + tolist() for ~50 neighbors
+        self._rows_columns = (
+            tmdb_ids.tolist(),
+            titles.tolist(),
+            years.tolist(),
+            poster_paths.tolist(),
+            genres_lists.tolist(),
+            present.tolist(),
+        )
+    
+    def __len__(self) -> int:
+        """Number of movies with data."""
+        return int(self.present.sum())
+    
+    @classmethod
+    def from_map(cls, movies_map: dict) -> "MoviesTable":
+        """
+        Build the table from the pickled dict-of-dicts movies map.
+        
+        Values are normalized the same way the API has always rendered them:
+        missing tmdb_id -> 0, title/year -> str, missing genres_list -> [].
+        
+        Args:
+            movies_map: Mapping of Annoy ID -> movie data dict
+        
+        Returns:
+            MoviesTable indexed by Annoy ID
+        """
+        size = max(movies_map, default=-1) + 1
+        tmdb_ids = np.zeros(size, dtype=np.int32)
+        titles = np.full(size, "", dtype=object)
+        years = np.full(size, "", dtype=object)
+        poster_paths = np.full(size, None, dtype=object)
+        genres_lists = np.empty(size, dtype=object)
+        present = np.zeros(size, dtype=bool)
+        
+        for annoy_id, movie_data in movies_map.items():
+            if not isinstance(movie_data, dict):
+                continue
+            tmdb_ids[annoy_id] = int(movie_data.get("tmdb_id", 0) or 0)
+            titles[annoy_id] = str(movie_data.get("title", ""))
+            years[annoy_id] = str(movie_data.get("year", ""))
+            poster_paths[annoy_id] = movie_data.get("poster_path")
+            genres_lists[annoy_id] = movie_data.get("genres_list", [])
+            present[annoy_id] = True
+        
+        return cls(tmdb_ids, titles, years, poster_paths, genres_lists, present)
+    
+    @classmethod
+    def from_columns(cls, columns: dict) -> "MoviesTable":
+        """
+        Build the table from the columnar layout produced by to_columns.
+        
+        Args:
+            columns: Dict with "annoy_ids" and one aligned list per field
+        
+        Returns:
+            MoviesTable indexed by Annoy ID
+        """
+        annoy_ids = np.asarray(columns["annoy_ids"], dtype=np.int64)
+        size = int(annoy_ids.max()) + 1 if annoy_ids.size else 0
+        tmdb_ids = np.zeros(size, dtype=np.int32)
+        titles = np.full(size, "", dtype=object)
+        years = np.full(size, "", dtype=object)
+        poster_paths = np.full(size, None, dtype=object)
+        genres_lists = np.empty(size, dtype=object)
+        present = np.zeros(size, dtype=bool)
+        
+        tmdb_ids[annoy_ids] = columns["tmdb_ids"]
+        titles[annoy_ids] = columns["titles"]
+        years[annoy_ids] = columns["years"]
+        poster_paths[annoy_ids] = columns["poster_paths"]
+        # Assigned one by one: NumPy would turn equal-length lists into a 2D array
+        for annoy_id, genres_list in zip(annoy_ids.tolist(), columns["genres_lists"]):
+            genres_lists[annoy_id] = genres_list
+        present[annoy_ids] = True
+        
+        return cls(tmdb_ids, titles, years, poster_paths, genres_lists, present)
+    
+    def to_columns(self) -> dict:
+        """
+        Export the table as plain lists (JSON-serializable), one per field.
+        
+        Returns:
+            Dict with "annoy_ids" and the aligned field lists
+        """
+        annoy_ids = np.flatnonzero(self.present)
+        return {
+            "annoy_ids": annoy_ids.tolist(),
+            "tmdb_ids": self.tmdb_ids[annoy_ids].tolist(),
+            "titles": self.titles[annoy_ids].tolist(),
+            "years": self.years[annoy_ids].tolist(),
+            "poster_paths": self.poster_paths[annoy_ids].tolist(),
+            "genres_lists": self.genres_lists[annoy_ids].tolist(),
+        }
+    
+    def tmdb_index(self) -> dict[int, int]:
+        """
+        Build the reverse index used for Warm Start lookups.
+        
+        Returns:
+            Mapping of TMDB ID -> Annoy ID for every movie with a TMDB ID
+        """
+        annoy_ids = np.flatnonzero(self.present & (self.tmdb_ids != 0))
+        return dict(zip(self.tmdb_ids[annoy_ids].tolist(), annoy_ids.tolist()))
+    
+    def rows(self, annoy_ids: Iterable[int]) -> List[dict]:
+        """
+        Gather the response dicts for a list of Annoy IDs, skipping unknown IDs.
+        
+        Args:
+            annoy_ids: Annoy IDs in ranking order
+        
+        Returns:
+            List of dicts with tmdb_id, title, year, poster_path, genres_list
+        """
+        tmdb_ids, titles, years, poster_paths, genres_lists, present = self._rows_columns
+        size = len(present)
+        
+        return [
+            {
+                "tmdb_id": tmdb_ids[annoy_id],
+                "title": titles[annoy_id],
+                "year": years[annoy_id],
+                "poster_path": poster_paths[annoy_id],
+                "genres_list": genres_lists[annoy_id],
+            }
+            for annoy_id in annoy_ids
+            if 0 <= annoy_id < size and present[annoy_id]
+        ]
@@ -0,0 +1,252 @@
+"""
+Vector search backends for the movie embeddings.
+
+Three interchangeable backends are supported, selected by the index file suffix:
+
+- `.ann` (AnnoyVectorIndex): approximate search over Annoy's random-projection
+  forest. One query at a time; a batch is spread over a thread pool since
+  Annoy releases the GIL while searching.
+- `.npy` (FlatVectorIndex): exact inner-product search over a memory-mapped
+  matrix of L2-normalized embeddings (the NumPy equivalent of a FAISS
+  IndexFlatIP). A whole micro-batch is scored with a single BLAS matmul.
+  The matrix may also be stored as int8 with per-row scales (4x smaller).
+  Build the file from the Annoy index with scripts/export_embeddings.py.
+- `.hnsw` (HnswVectorIndex): approximate search over an hnswlib HNSW graph
+  (cosine space, SIMD distance kernels). A batch is one knn_query call that
+  hnswlib spreads over its own threads. Build the file from the .npy
+  embeddings with scripts/build_hnsw_index.py; needs `pip install hnswlib`.
+"""
+import os
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import List
+
+import numpy as np
+from annoy import AnnoyIndex
+
+# Rows of an int8 matrix dequantized per block: bounds the float32 temporary
+# (~6MB at 384 dims) while keeping each block's matmul BLAS-sized
+INT8_BLOCK_ROWS = 4096
+
+
+def scales_path(path: Path) -> Path:
+    """Path of the per-row scales stored next to an int8 embedding matrix."""
+    return path.with_name(f"{path.stem}.scales.npy")
+
+
+def _readahead(path: Path) -> None:
+    """
+    Ask the kernel to start reading a file into the page cache in the background.
+    
+    Unlike prefault, nothing is mapped into the process: the pages are
+    reclaimable cache shared by every worker, and the first queries find
+    them resident instead of faulting on a cold disk. No-op where
+    posix_fadvise is unavailable.
+    """
+    if not hasattr(os, "posix_fadvise"):
+        return
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_WILLNEED)
+    finally:
+        os.close(fd)
+
+
+class AnnoyVectorIndex:
+    """
+    Approximate nearest neighbor search backed by an Annoy index.
+    """
+    
+    def __init__(self, path: Path, dim: int, threads: int, search_k: int = -1, prefault: bool = False):
+        """
+        Load the Annoy index.
+        
+        Args:
+            path: Path to the .ann file
+            dim: Embedding dimension
+            threads: Worker threads used to run the searches of a batch
+            search_k: Nodes inspected per search (-1: Annoy's default of n_trees * k).
+                Higher values raise recall at the cost of latency
+            prefault: Read the whole file into the page cache at load time
+        """
+        # Annoy mmaps the index file: with prefault=False pages are loaded on
+        # demand and the OS page cache is shared by every worker process
+        # (an async readahead still warms that cache); prefault=True
+        # (MAP_POPULATE) pays the page faults at startup instead of on the
+        # first queries
+        self.index = AnnoyIndex(dim, "angular")
+        self.index.load(str(path), prefault=prefault)
+        if not prefault:
+            _readahead(path)
+        self._pool = ThreadPoolExecutor(max_workers=threads)
+        self.search_k = search_k
+    
+    def __len__(self) -> int:
+        return self.index.get_n_items()
+    
+    def get_item_vector(self, item: int) -> np.ndarray:
+        """Return the stored embedding of an item."""
+        return np.array(self.index.get_item_vector(item), dtype=np.float32)
+    
+    def search(self, vector: np.ndarray, k: int) -> List[int]:
+        """Return the IDs of the k nearest items, closest first."""
+        # Annoy reads the query with one PyObject_GetItem per element: a list of
+        # prebuilt floats is the fastest input (array.array or the ndarray itself
+        # box a new float per element and measured ~15-25% slower per search).
+        # search_k is passed positionally to skip keyword argument parsing
+        return self.index.get_nns_by_vector(vector.tolist(), k, self.search_k)
+    
+    def search_item(self, item: int, k: int) -> List[int]:
+        """Return the k nearest items to a stored item, without copying its vector out of Annoy."""
+        return self.index.get_nns_by_item(item, k, self.search_k)
+    
+    def search_batch(self, vectors: np.ndarray, ks: List[int]) -> List[List[int]]:
+        """Run one search per row; rows are searched concurrently."""
+        if len(vectors) == 1:
+            return [self.search(vectors[0], ks[0])]
+        return list(self._pool.map(self.search, vectors, ks))
+
+
+class FlatVectorIndex:
+    """
+    Exact inner-product search over a memory-mapped, L2-normalized embedding matrix.
+    
+    An int8 matrix is symmetrically quantized per row (row ≈ int8_row * scale,
+    scales in a sidecar "<name>.scales.npy"). The query stays float32 and is
+    scored against dequantized blocks, so BLAS still does the work.
+    """
+    
+    def __init__(self, path: Path, dim: int):
+        """
+        Memory-map the embedding matrix.
+        
+        Args:
+            path: Path to the .npy file with shape [n_items, dim] (float32 or int8, L2-normalized)
+            dim: Embedding dimension
+        """
+        # mmap_mode="r" shares the pages between worker processes
+        self.embeddings = np.load(path, mmap_mode="r")
+        if self.embeddings.ndim != 2 or self.embeddings.shape[1] != dim:
+            raise ValueError(f"Expected embeddings with shape [n, {dim}], got {self.embeddings.shape}")
+        
+        self.scales: np.ndarray | None = None
+        if self.embeddings.dtype == np.int8:
+            self.scales = np.load(scales_path(path)).astype(np.float32)
+            if self.scales.shape != (self.embeddings.shape[0],):
+                raise ValueError(f"Expected {self.embeddings.shape[0]} scales, got {self.scales.shape}")
+    
+    def __len__(self) -> int:
+        return self.embeddings.shape[0]
+    
+    def get_item_vector(self, item: int) -> np.ndarray:
+        """Return the stored embedding of an item."""
+        vector = np.asarray(self.embeddings[item], dtype=np.float32)
+        if self.scales is not None:
+            vector *= self.scales[item]
+        return vector
+    
+    def search(self, vector: np.ndarray, k: int) -> List[int]:
+        """Return the IDs of the k most similar items, closest first."""
+        return self.search_batch(vector[np.newaxis], [k])[0]
+    
+    def search_item(self, item: int, k: int) -> List[int]:
+        """Return the k most similar items to a stored item."""
+        return self.search(self.get_item_vector(item), k)
+    
+    def _scores(self, vectors: np.ndarray) -> np.ndarray:
+        """Inner products of every row against all items, shape [n_rows, n_items]."""
+        vectors = np.asarray(vectors, dtype=np.float32)
+        if self.scales is None:
+            return vectors @ self.embeddings.T
+        
+        scores = np.empty((len(vectors), len(self)), dtype=np.float32)
+        for start in range(0, len(self), INT8_BLOCK_ROWS):
+            block = self.embeddings[start:start + INT8_BLOCK_ROWS].astype(np.float32)
+            np.matmul(vectors, block.T, out=scores[:, start:start + len(block)])
+        scores *= self.scales
+        return scores
+    
+    def search_batch(self, vectors: np.ndarray, ks: List[int]) -> List[List[int]]:
+        """Score every row against all items with one matmul, then take each row's top k."""
+        scores = self._scores(vectors)
+        results = []
+        for row, k in zip(scores, ks):
+            k = min(k, row.size)
+            top = np.argpartition(-row, k - 1)[:k]
+            results.append(top[np.argsort(-row[top])].tolist())
+        return results
+
+
+class HnswVectorIndex:
+    """
+    Approximate nearest neighbor search backed by an hnswlib HNSW graph.
+    """
+    
+    def __init__(self, path: Path, dim: int, threads: int, ef: int = 128):
+        """
+        Load the HNSW index.
+        
+        Args:
+            path: Path to the .hnsw file (built in "cosine" space)
+            dim: Embedding dimension
+            threads: Threads used by knn_query for a batch
+            ef: Size of the candidate list during search (hnswlib uses max(ef, k)).
+                Higher values raise recall at the cost of latency
+        """
+        # Optional dependency: only needed when INDEX_PATH points at a .hnsw file
+        import hnswlib
+        
+        self.index = hnswlib.Index(space="cosine", dim=dim)
+        self.index.load_index(str(path))
+        self.index.set_ef(ef)
+        self.index.set_num_threads(threads)
+    
+    def __len__(self) -> int:
+        return self.index.get_current_count()
+    
+    def get_item_vector(self, item: int) -> np.ndarray:
+        """Return the stored (normalized) embedding of an item."""
+        return np.asarray(self.index.get_items([item])[0], dtype=np.float32)
+    
+    def search(self, vector: np.ndarray, k: int) -> List[int]:
+        """Return the IDs of the k nearest items, closest first."""
+        return self.search_batch(vector[np.newaxis], [k])[0]
+    
+    def search_item(self, item: int, k: int) -> List[int]:
+        """Return the k nearest items to a stored item."""
+        return self.search(self.get_item_vector(item), k)
+    
+    def search_batch(self, vectors: np.ndarray, ks: List[int]) -> List[List[int]]:
+        """Query the whole batch at once with the largest k, then trim each row."""
+        k = min(max(ks), len(self))
+        labels, _ = self.index.knn_query(np.asarray(vectors, dtype=np.float32), k=k)
+        return [row[:row_k].tolist() for row, row_k in zip(labels, ks)]
+
+
+def load_vector_index(
+    path: Path,
+    dim: int,
+    threads: int,
+    search_k: int = -1,
+    prefault: bool = False,
+    ef: int = 128,
+) -> AnnoyVectorIndex | FlatVectorIndex | HnswVectorIndex:
+    """
+    Load the vector index backend matching the file suffix.
+    
+    Args:
+        path: Path to the index (.ann for Annoy, .npy for exact flat search, .hnsw for HNSW)
+        dim: Embedding dimension
+        threads: Worker threads for backends that search row by row
+        search_k: Annoy nodes inspected per search (-1: Annoy's default)
+        prefault: Page the Annoy index into memory at load time
+        ef: HNSW candidate list size per search
+    
+    Returns:
+        Loaded vector index
+    """
+    if path.suffix == ".npy":
+        return FlatVectorIndex(path, dim)
+    if path.suffix == ".hnsw":
+        return HnswVectorIndex(path, dim, threads, ef)
+    return AnnoyVectorIndex(path, dim, threads, search_k, prefault)
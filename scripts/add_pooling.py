@@ -0,0 +1,91 @@
+"""
+Append masked mean pooling + L2 normalization to the ONNX encoder graph.
+
+The exported model returns last_hidden_state ([batch, seq, 384]) and the API
+pools it in NumPy. With the pooling nodes inside the graph the model returns
+the final normalized sentence embedding ([batch, 384]) instead: ONNX Runtime
+runs the reduction next to the last layer and only 384 floats per text cross
+back into Python. The API detects the 2-D output and skips its own pooling.
+
+Works on the FP32 export or on the already quantized model (opset >= 13).
+
+Requires the `onnx` package (build-time only, not needed by the API):
+    pip install onnx
+
+Usage:
+    python scripts/add_pooling.py models/model_quantized/model_quantized.onnx \\
+        models/model_quantized/model_quantized_pooled.onnx
+"""
+import argparse
+from pathlib import Path
+
+import numpy as np
+import onnx
+from onnx import TensorProto, helper, numpy_helper
+
+OUTPUT_NAME = "sentence_embedding"
+
+
+def add_pooling(model: onnx.ModelProto) -> onnx.ModelProto:
+    """
+    Replace the model's last_hidden_state output with a pooled, normalized embedding.
+    
+    Args:
+        model: Encoder with inputs attention_mask and output last_hidden_state
+    
+    Returns:
+        The same model, whose only output is sentence_embedding [batch, hidden]
+    """
+    graph = model.graph
+    hidden_output = graph.output[0]
+    hidden_name = hidden_output.name
+    hidden_size = hidden_output.type.tensor_type.shape.dim[2].dim_value
+    mask_name = next(i.name for i in graph.input if "attention" in i.name.lower() or "mask" in i.name.lower())
+    
+    graph.initializer.extend([
+        numpy_helper.from_array(np.array([1], dtype=np.int64), "pool_axis_seq"),
+        numpy_helper.from_array(np.array([2], dtype=np.int64), "pool_axis_hidden"),
+        numpy_helper.from_array(np.array([-1], dtype=np.int64), "pool_axis_last"),
+        numpy_helper.from_array(np.array(1e-9, dtype=np.float32), "pool_min_count"),
+        numpy_helper.from_array(np.array(1e-12, dtype=np.float32), "pool_min_norm"),
+    ])
+    graph.node.extend([
+        # Masked sum over the sequence, divided by the number of real tokens
+        helper.make_node("Cast", [mask_name], ["pool_mask"], to=TensorProto.FLOAT),
+        helper.make_node("Unsqueeze", ["pool_mask", "pool_axis_hidden"], ["pool_mask_3d"]),
+        helper.make_node("Mul", [hidden_name, "pool_mask_3d"], ["pool_masked"]),
+        helper.make_node("ReduceSum", ["pool_masked", "pool_axis_seq"], ["pool_sum"], keepdims=0),
+        helper.make_node("ReduceSum", ["pool_mask", "pool_axis_seq"], ["pool_count"], keepdims=1),
+        helper.make_node("Max", ["pool_count", "pool_min_count"], ["pool_count_safe"]),
+        helper.make_node("Div", ["pool_sum", "pool_count_safe"], ["pool_mean"]),
+        # L2 normalization
+        helper.make_node("Mul", ["pool_mean", "pool_mean"], ["pool_squares"]),
+        helper.make_node("ReduceSum", ["pool_squares", "pool_axis_last"], ["pool_sum_squares"], keepdims=1),
+        helper.make_node("Sqrt", ["pool_sum_squares"], ["pool_norm"]),
+        helper.make_node("Max", ["pool_norm", "pool_min_norm"], ["pool_norm_safe"]),
+        helper.make_node("Div", ["pool_mean", "pool_norm_safe"], [OUTPUT_NAME]),
+    ])
+    
+    del graph.output[:]
+    graph.output.append(
+        helper.make_tensor_value_info(OUTPUT_NAME, TensorProto.FLOAT, ["batch_size", hidden_size])
+    )
+    onnx.checker.check_model(model)
+    return model
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("model_input", type=Path, help="Path to the ONNX encoder")
+    parser.add_argument("model_output", type=Path, help="Path to write the pooled model")
+    args = parser.parse_args()
+    
+    print(f"Adding pooling: {args.model_input} -> {args.model_output}")
+    model = add_pooling(onnx.load(str(args.model_input)))
+    args.model_output.parent.mkdir(parents=True, exist_ok=True)
+    onnx.save(model, str(args.model_output))
+    print(f"Done: output {OUTPUT_NAME} [batch_size, hidden_size]")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,45 @@
+"""
+Build an HNSW index (hnswlib) from the normalized movie embeddings.
+
+The input is the .npy matrix written by scripts/export_embeddings.py; row i
+keeps Annoy ID i as its label, so movies_map.pkl works unchanged. Point
+INDEX_PATH at the resulting .hnsw file to search the HNSW graph instead of
+Annoy's random-projection forest.
+
+Requires the `hnswlib` package (also needed by the API when serving a .hnsw index):
+    pip install hnswlib
+
+Usage:
+    python scripts/build_hnsw_index.py models/movies_emb.npy models/movies.hnsw
+"""
+import argparse
+from pathlib import Path
+
+import hnswlib
+import numpy as np
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("embeddings_input", type=Path, help="Path to the embeddings (.npy)")
+    parser.add_argument("index_output", type=Path, help="Path to write the HNSW index (.hnsw)")
+    parser.add_argument("--m", type=int, default=16, help="Graph links per node (memory vs recall)")
+    parser.add_argument("--ef-construction", type=int, default=200, help="Candidate list size while building")
+    args = parser.parse_args()
+    
+    embeddings = np.load(args.embeddings_input)
+    n_items, dim = embeddings.shape
+    
+    print(f"Building HNSW index over {n_items} vectors (M={args.m}, ef_construction={args.ef_construction})")
+    index = hnswlib.Index(space="cosine", dim=dim)
+    index.init_index(max_elements=n_items, M=args.m, ef_construction=args.ef_construction)
+    index.add_items(embeddings, np.arange(n_items))
+    
+    args.index_output.parent.mkdir(parents=True, exist_ok=True)
+    index.save_index(str(args.index_output))
+    size = args.index_output.stat().st_size / 1024 / 1024
+    print(f"Done: {args.index_output} ({size:.2f} MB)")
+
+
+if __name__ == "__main__":
+    main()
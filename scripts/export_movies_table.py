@@ -0,0 +1,44 @@
+"""
+Convert the pickled movies map into the columnar JSON layout.
+
+The pickle is a dict of ~17k small dicts keyed by Annoy ID; unpickling it
+allocates every one of them just to be flattened into MoviesTable columns.
+The JSON file stores those columns directly ("annoy_ids" plus one aligned
+list per field) and loads with a single orjson.loads. Point MOVIES_MAP_PATH
+at the .json file to use it (the .pkl keeps working).
+
+Usage:
+    python scripts/export_movies_table.py models/movies_map.pkl models/movies_table.json
+"""
+import argparse
+import pickle
+import sys
+from pathlib import Path
+
+import orjson
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.services.movies_table import MoviesTable  # noqa: E402
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("movies_map_input", type=Path, help="Path to the movies map (.pkl)")
+    parser.add_argument("table_output", type=Path, help="Path to write the columnar table (.json)")
+    args = parser.parse_args()
+    
+    with open(args.movies_map_input, "rb") as f:
+        movies_map = pickle.load(f)
+    
+    table = MoviesTable.from_map(movies_map)
+    print(f"Exporting {len(table)} movies from {args.movies_map_input}")
+    
+    args.table_output.parent.mkdir(parents=True, exist_ok=True)
+    args.table_output.write_bytes(orjson.dumps(table.to_columns()))
+    size = args.table_output.stat().st_size / 1024 / 1024
+    print(f"Done: {args.table_output} ({size:.2f} MB)")
+
+
+if __name__ == "__main__":
+    main()